@@ -5,9 +5,12 @@ Processes incoming queries and manages agent interactions.
 import json
 import boto3
 import logging
+import time
 import uuid
 from botocore.exceptions import ClientError
 
+from fleet_health import compact_summary, load_fleet_summary
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -19,6 +22,11 @@ bedrock_agent_runtime = boto3.client('bedrock-agent-runtime')
 BEDROCK_AGENT_ID = 'GMJGK6RO4S'
 BEDROCK_AGENT_ALIAS_ID = 'TSTALIASID'
 
+# Fleet health prefetch: compact per-device summary passed to the agent as prompt session attributes
+FLEET_PREFETCH_TTL_SECONDS = 60
+FLEET_PREFETCH_MAX_DEVICES = 50
+_fleet_prefetch_cache = {'loaded_at': 0.0, 'attributes': None}
+
 def get_cors_headers():
     """Get CORS headers for response."""
     return {
@@ -29,6 +37,30 @@ def get_cors_headers():
         'Access-Control-Max-Age': '300'
     }
 
+def get_fleet_session_attributes():
+    """
+    Build prompt session attributes from the precomputed fleet summary.
+    Cached per container; returns an empty dict if the summary is unavailable.
+    """
+    now = time.monotonic()
+    if _fleet_prefetch_cache['attributes'] is not None and now - _fleet_prefetch_cache['loaded_at'] < FLEET_PREFETCH_TTL_SECONDS:
+        return _fleet_prefetch_cache['attributes']
+
+    try:
+        summary = load_fleet_summary()
+    except Exception as e:
+        logger.warning(f"Fleet summary prefetch failed: {e}")
+        return {}
+
+    attributes = {
+        'fleet_summary_generated_at': summary['generated_at'],
+        'fleet_device_count': str(len(summary['devices'])),
+        'fleet_health_format': 'device|latest_fault|confidence|severity|vibration_trend (most at-risk first)',
+        'fleet_health': compact_summary(summary, FLEET_PREFETCH_MAX_DEVICES),
+    }
+    _fleet_prefetch_cache.update(loaded_at=now, attributes=attributes)
+    return attributes
+
 def lambda_handler(event, context):
     """
     Main Lambda handler for processing Bedrock Agent queries.
@@ -89,13 +121,17 @@ def lambda_handler(event, context):
         logger.info(f"Processing query: {query[:100]}... (Session: {session_id})")
         logger.info(f"Using Agent ID: {BEDROCK_AGENT_ID}, Alias: {BEDROCK_AGENT_ALIAS_ID}")
         
+        # Prefetch fleet health so the agent does not need knowledge-base retrieval for fleet questions
+        session_attributes = get_fleet_session_attributes()
+        
         # Invoke Bedrock Agent
         try:
             response = bedrock_agent_runtime.invoke_agent(
                 agentId=BEDROCK_AGENT_ID,
                 agentAliasId=BEDROCK_AGENT_ALIAS_ID,
                 sessionId=session_id,
-                inputText=query
+                inputText=query,
+                sessionState={'promptSessionAttributes': session_attributes}
             )
             
             logger.info("Bedrock agent invoked successfully")
@@ -4,6 +4,8 @@ import boto3
 import numpy as np
 import pandas as pd
 
+from sensor_schema import CHANNELS, COLUMN, COLUMN_DTYPES, NUMERIC_COLUMNS
+
 # ==========================================================
 # CONFIGURATION
 # ==========================================================
@@ -36,12 +38,11 @@ def load_reference_data_from_s3(bucket: str, key: str) -> pd.DataFrame | None:
     if "Fault" in df.columns:
         df["Fault"] = df["Fault"].astype(str).str.strip().str.lower()
 
-    numeric_cols = ["Load (kg)", "Speed (rpm)", "Current (A)", "Vibration (m/s²)", "Temperature (℃)"]
-    for col in numeric_cols:
+    for col in NUMERIC_COLUMNS:
         df[col] = pd.to_numeric(df[col], errors="coerce")
 
     # drop rows missing numeric data
-    df = df.dropna(subset=numeric_cols)
+    df = df.dropna(subset=NUMERIC_COLUMNS).astype(COLUMN_DTYPES)
 
     print(f"🧹 Cleaned dataset: {len(df)} valid numeric rows remain.")
     return df
@@ -52,14 +53,13 @@ def load_reference_data_from_s3(bucket: str, key: str) -> pd.DataFrame | None:
 # ==========================================================
 def compute_feature_baselines(df: pd.DataFrame) -> dict:
     """Compute mean/std/correlation per fault class."""
-    numeric_cols = ["Load (kg)", "Speed (rpm)", "Current (A)", "Vibration (m/s²)", "Temperature (℃)"]
     baselines = {}
 
     for fault, group in df.groupby("Fault"):
         baselines[fault] = {
-            "mean": group[numeric_cols].mean().to_dict(),
-            "std": group[numeric_cols].std().to_dict(),
-            "corr": group[numeric_cols].corr().to_dict(),
+            "mean": group[NUMERIC_COLUMNS].mean().to_dict(),
+            "std": group[NUMERIC_COLUMNS].std().to_dict(),
+            "corr": group[NUMERIC_COLUMNS].corr().to_dict(),
         }
 
     print(f"✅ Computed baselines for {len(baselines)} fault classes: {list(baselines.keys())}")
@@ -83,11 +83,10 @@ def simulate_conveyor_batch(device_id: str, fault: str, baselines: dict, n: int
     base = baselines.get(fault, baselines["normal"])  # fallback to normal if fault missing
     mu, sigma = base["mean"], base["std"]
 
-    load = rng.normal(mu["Load (kg)"], sigma["Load (kg)"], n)
-    speed = rng.normal(mu["Speed (rpm)"], sigma["Speed (rpm)"], n)
-    current = rng.normal(mu["Current (A)"], sigma["Current (A)"], n)
-    vibration = rng.normal(mu["Vibration (m/s²)"], sigma["Vibration (m/s²)"], n)
-    temperature = rng.normal(mu["Temperature (℃)"], sigma["Temperature (℃)"], n)
+    # Every registered channel is sampled from its baseline; faults then modify the core channels
+    signals = {ch.key: rng.normal(mu[ch.column], sigma[ch.column], n) for ch in CHANNELS}
+    speed, load, temperature = signals["speed"], signals["load"], signals["temperature"]
+    vibration, current = signals["vibration"], signals["current"]
 
     # ===== Fault-specific modifiers =====
     if fault == "ball_bearing":
@@ -124,11 +123,7 @@ def simulate_conveyor_batch(device_id: str, fault: str, baselines: dict, n: int
     df = pd.DataFrame({
         "timestamp": timestamps,
         "device_id": device_id,
-        "Speed (rpm)": speed,
-        "Load (kg)": load,
-        "Temperature (℃)": temperature,
-        "Vibration (m/s²)": vibration,
-        "Current (A)": current,
+        **{ch.column: signals[ch.key] for ch in CHANNELS},
         "Fault": fault,
     })
 
@@ -179,7 +174,7 @@ def lambda_handler(event=None, context=None):
 
     print(f"🚧 Simulated {N_SAMPLES} samples from {DEVICE_ID} (fault: {fault})")
     print(df.head(3))
-    print("Correlation matrix:\n", df[["Load (kg)", "Current (A)", "Vibration (m/s²)", "Temperature (℃)"]].corr().round(2))
+    print("Correlation matrix:\n", df[[COLUMN["load"], COLUMN["current"], COLUMN["vibration"], COLUMN["temperature"]]].corr().round(2))
 
     batch_publish_to_iot(df)
     upload_to_s3_batch(df)
@@ -190,7 +185,7 @@ def lambda_handler(event=None, context=None):
             "device_id": DEVICE_ID,
             "samples_generated": len(df),
             "fault_simulated": fault,
-            "avg_vibration": round(df["Vibration (m/s²)"].mean(), 3),
-            "avg_current": round(df["Current (A)"].mean(), 3)
+            "avg_vibration": round(df[COLUMN["vibration"]].mean(), 3),
+            "avg_current": round(df[COLUMN["current"]].mean(), 3)
         }),
     }
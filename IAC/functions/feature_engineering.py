@@ -3,6 +3,8 @@ from datetime import datetime, timezone
 import pandas as pd
 import numpy as np
 
+from sensor_schema import CHANNEL_FEATURE_NAMES, CHANNELS, COLUMN, STAT_FEATURE_NAMES
+
 # AWS Clients
 s3 = boto3.client("s3")
 sm_runtime = boto3.client("sagemaker-runtime")
@@ -11,6 +13,18 @@ FEATURE_BUCKET = os.getenv("FEATURE_BUCKET", "predictive-maintenance-feature-sto
 ENDPOINT_NAME = os.getenv("SAGEMAKER_ENDPOINT", "sagemaker-xgboost-2025-10-12-11-39-56-079")
 
 # ---- Feature computation helpers ----
+# Cross-channel features, computed after the per-channel stats: name -> fn(series keyed by channel key)
+DERIVED_FEATURES = {
+    "corr_vibration_load": lambda s: s["vibration"].corr(s["load"]),
+    "corr_temp_current": lambda s: s["temperature"].corr(s["current"]),
+    "power_mean": lambda s: (s["speed"] * s["load"]).mean(),
+    "stress_index": lambda s: ((s["load"] * s["vibration"]) / s["speed"]).mean(),
+    "thermal_ratio": lambda s: (s["temperature"] / s["load"]).mean(),
+}
+
+# Model input features, in payload order
+FEATURE_NAMES = CHANNEL_FEATURE_NAMES + list(DERIVED_FEATURES)
+
 def compute_basic_stats(series: pd.Series):
     return {
         "mean": series.mean(),
@@ -23,24 +37,13 @@ def compute_basic_stats(series: pd.Series):
 
 def compute_features(df: pd.DataFrame) -> dict:
     features = {}
-    numeric_cols = ["Speed (rpm)", "Load (kg)", "Temperature (℃)", "Vibration (m/s²)", "Current (A)"]
-    
-    for col in numeric_cols:
-        col_safe = (
-            col.replace(" ", "_")
-               .replace("(", "")
-               .replace(")", "")
-               .replace("℃", "C")
-               .replace("/", "_")
-               .replace("²", "2")
-        )
-        features.update({f"{col_safe}_{stat}": val for stat, val in compute_basic_stats(df[col]).items()})
-
-    features["corr_vibration_load"] = df["Vibration (m/s²)"].corr(df["Load (kg)"])
-    features["corr_temp_current"] = df["Temperature (℃)"].corr(df["Current (A)"])
-    features["power_mean"] = (df["Speed (rpm)"] * df["Load (kg)"]).mean()
-    features["stress_index"] = ((df["Load (kg)"] * df["Vibration (m/s²)"]) / df["Speed (rpm)"]).mean()
-    features["thermal_ratio"] = (df["Temperature (℃)"] / df["Load (kg)"]).mean()
+
+    for ch in CHANNELS:
+        features.update(zip(STAT_FEATURE_NAMES[ch.column], compute_basic_stats(df[ch.column]).values()))
+
+    series = {key: df[column] for key, column in COLUMN.items()}
+    for name, derive in DERIVED_FEATURES.items():
+        features[name] = derive(series)
 
     # Metadata
     features["device_id"] = df["device_id"].iloc[0]
@@ -52,6 +55,97 @@ def compute_features(df: pd.DataFrame) -> dict:
 
     return features
 
+# ---- Pipeline steps (shared with the streaming consumer) ----
+def features_from_json(raw_data: str) -> dict:
+    df = pd.read_json(io.StringIO(raw_data))
+
+    if df.empty:
+        raise ValueError("Raw data is empty.")
+
+    return compute_features(df)
+
+def _object_name(timestamp: str, object_id: str | None) -> str:
+    # object_id keeps keys unique when several windows of one device land in the same second
+    return f"{timestamp}_{object_id}" if object_id else timestamp
+
+def save_features(features: dict, timestamp: str, object_id: str | None = None) -> str:
+    feature_key = f"features/{features['device_id']}/{_object_name(timestamp, object_id)}.json"
+    s3.put_object(Bucket=FEATURE_BUCKET, Key=feature_key, Body=json.dumps(features))
+    print(f"✅ Features saved to s3://{FEATURE_BUCKET}/{feature_key}")
+    return feature_key
+
+def invoke_model(features: dict) -> dict:
+    # Prepare payload for inference — drop extra fields
+    model_features = {k: features[k] for k in FEATURE_NAMES}
+
+    payload = {"instances": [model_features]}
+    print(f"📦 Payload feature count: {len(model_features)}")
+
+    # Send to SageMaker endpoint
+    response = sm_runtime.invoke_endpoint(
+        EndpointName=ENDPOINT_NAME,
+        ContentType="application/json",
+        Body=json.dumps(payload)
+    )
+
+    result = json.loads(response["Body"].read().decode("utf-8"))
+    print(f"🧠 Model inference result: {result}")
+    return result
+
+def save_inference(features: dict, result: dict, timestamp: str, source_key: str,
+                   object_id: str | None = None) -> tuple[str, str]:
+    device_id = features["device_id"]
+    name = _object_name(timestamp, object_id)
+    inference_key_json = f"inference/{device_id}/{name}.json"
+    inference_key_txt = f"knowledge-base-inference/{device_id}/{name}.txt"
+
+    # JSON output
+    s3.put_object(
+        Bucket=FEATURE_BUCKET,
+        Key=inference_key_json,
+        Body=json.dumps(result, indent=2)
+    )
+
+    # TXT summary (for knowledge base ingestion)
+    txt_summary = (
+        f"--- Predictive Maintenance Inference Report ---\n"
+        f"Device ID: {device_id}\n"
+        f"Time Window: {features['window_start']} → {features['window_end']}\n"
+        f"Source Data: {source_key}\n"
+        f"Inference Timestamp (UTC): {timestamp}\n\n"
+
+        f"🧠 Model Prediction Summary:\n"
+        f"  - Predicted Fault Type: {result.get('predicted_class', 'unknown')}\n"
+        f"  - Confidence Score: {result.get('confidence', 'N/A')}\n\n"
+
+        f"Top Class Probabilities:\n" +
+        "\n".join([f"  • {k}: {v:.3f}" for k, v in result.get('top_k', {}).items()]) +
+        "\n\n"
+
+        f"Operational Feature Snapshot (key stats):\n" +
+        "".join(f"  - Mean {ch.label} ({ch.unit}): {features[f'{ch.safe_name}_mean']:.2f}\n" for ch in CHANNELS) +
+        f"  - Stress Index: {features.get('stress_index', 'N/A'):.4f}\n"
+        f"  - Thermal Ratio: {features.get('thermal_ratio', 'N/A'):.4f}\n"
+        f"  - Power Mean: {features.get('power_mean', 'N/A'):.2f}\n"
+        f"  - Corr(Vibration, Load): {features.get('corr_vibration_load', 'N/A'):.3f}\n"
+        f"  - Corr(Temp, Current): {features.get('corr_temp_current', 'N/A'):.3f}\n\n"
+
+        f"🧾 Interpretation:\n"
+        f"The model predicts that device {device_id} is exhibiting signs consistent with "
+        f"'{result.get('predicted_class', 'unknown')}'. "
+        f"This conclusion is based on the observed operational conditions above. "
+    )
+
+    # Text output
+    s3.put_object(
+        Bucket=FEATURE_BUCKET,
+        Key=inference_key_txt,
+        Body=txt_summary
+    )
+
+    print(f"💾 Inference saved to S3 as JSON and TXT")
+    return inference_key_json, inference_key_txt
+
 # ---- Lambda entrypoint ----
 def lambda_handler(event, context):
     try:
@@ -64,89 +158,16 @@ def lambda_handler(event, context):
         # Load raw data from S3
         raw_obj = s3.get_object(Bucket=bucket, Key=key)
         raw_data = raw_obj["Body"].read().decode("utf-8")
-        df = pd.read_json(io.StringIO(raw_data))
-
-        if df.empty:
-            raise ValueError("Raw data is empty.")
 
         # Compute features
-        features = compute_features(df)
+        features = features_from_json(raw_data)
 
         # Persist to feature store
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        feature_key = f"features/{features['device_id']}/{timestamp}.json"
-        s3.put_object(Bucket=FEATURE_BUCKET, Key=feature_key, Body=json.dumps(features))
-        print(f"✅ Features saved to s3://{FEATURE_BUCKET}/{feature_key}")
-
-        # Prepare payload for inference — drop extra fields
-        model_features = {k: v for k, v in features.items() if k not in ["device_id", "window_start", "window_end", "fault_label"]}
-        
-        payload = {"instances": [model_features]}
-        print(f"📦 Payload feature count: {len(model_features)}")
-
-        # Send to SageMaker endpoint
-        response = sm_runtime.invoke_endpoint(
-            EndpointName=ENDPOINT_NAME,
-            ContentType="application/json",
-            Body=json.dumps(payload)
-        )
-
-        result = json.loads(response["Body"].read().decode("utf-8"))
-        print(f"🧠 Model inference result: {result}")
-
-        device_id = features["device_id"]
-        inference_key_json = f"inference/{device_id}/{timestamp}.json"
-        inference_key_txt = f"knowledge-base-inference/{device_id}/{timestamp}.txt"
-
-        # JSON output
-        s3.put_object(
-            Bucket=FEATURE_BUCKET,
-            Key=inference_key_json,
-            Body=json.dumps(result, indent=2)
-        )
-
-        # TXT summary (for knowledge base ingestion)
-        txt_summary = (
-            f"--- Predictive Maintenance Inference Report ---\n"
-            f"Device ID: {device_id}\n"
-            f"Time Window: {features['window_start']} → {features['window_end']}\n"
-            f"Source Data: {features.get('source_key', key)}\n"
-            f"Inference Timestamp (UTC): {timestamp}\n\n"
-
-            f"🧠 Model Prediction Summary:\n"
-            f"  - Predicted Fault Type: {result.get('predicted_class', 'unknown')}\n"
-            f"  - Confidence Score: {result.get('confidence', 'N/A')}\n\n"
-
-            f"Top Class Probabilities:\n" +
-            "\n".join([f"  • {k}: {v:.3f}" for k, v in result.get('top_k', {}).items()]) +
-            "\n\n"
-
-            f"Operational Feature Snapshot (key stats):\n"
-            f"  - Mean Speed (rpm): {features.get('Speed_rpm_mean', 'N/A'):.2f}\n"
-            f"  - Mean Load (kg): {features.get('Load_kg_mean', 'N/A'):.2f}\n"
-            f"  - Mean Temperature (°C): {features.get('Temperature_C_mean', 'N/A'):.2f}\n"
-            f"  - Mean Vibration (m/s²): {features.get('Vibration_m_s2_mean', 'N/A'):.2f}\n"
-            f"  - Mean Current (A): {features.get('Current_A_mean', 'N/A'):.2f}\n"
-            f"  - Stress Index: {features.get('stress_index', 'N/A'):.4f}\n"
-            f"  - Thermal Ratio: {features.get('thermal_ratio', 'N/A'):.4f}\n"
-            f"  - Power Mean: {features.get('power_mean', 'N/A'):.2f}\n"
-            f"  - Corr(Vibration, Load): {features.get('corr_vibration_load', 'N/A'):.3f}\n"
-            f"  - Corr(Temp, Current): {features.get('corr_temp_current', 'N/A'):.3f}\n\n"
-
-            f"🧾 Interpretation:\n"
-            f"The model predicts that device {device_id} is exhibiting signs consistent with "
-            f"'{result.get('predicted_class', 'unknown')}'. "
-            f"This conclusion is based on the observed operational conditions above. "
-        )
-
-        # Text output
-        s3.put_object(
-            Bucket=FEATURE_BUCKET,
-            Key=inference_key_txt,
-            Body=txt_summary
-        )
-
-        print(f"💾 Inference saved to S3 as JSON and TXT")
+        feature_key = save_features(features, timestamp)
+
+        result = invoke_model(features)
+        inference_key_json, inference_key_txt = save_inference(features, result, timestamp, key)
 
         return {
             "statusCode": 200,
@@ -160,4 +181,4 @@ def lambda_handler(event, context):
 
     except Exception as e:
         print(f"❌ Error: {e}")
-        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
@@ -0,0 +1,325 @@
+"""
+Fleet health summaries for the Bedrock maintenance agent.
+Aggregates the per-reading inference analytics into compact per-device summaries and answers
+structured agent queries (action group) from them instead of knowledge-base retrieval.
+"""
+import boto3
+import heapq
+import json
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sensor_schema import FIELD_MAPPING
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+s3_client = boto3.client("s3")
+
+S3_BUCKET = os.environ.get("S3_BUCKET_NAME", "relu-quicksight")
+ANALYTICS_PREFIX = "inference_analytics/"
+DAILY_PREFIX = "fleet_summary/daily/"
+HOURLY_PREFIX = "fleet_summary/hourly/"
+SUMMARY_KEY = os.environ.get("FLEET_SUMMARY_KEY", "fleet_summary/device_health.json")
+WINDOW_DAYS = int(os.environ.get("FLEET_SUMMARY_DAYS", "7"))
+READ_THREADS = int(os.environ.get("FLEET_SUMMARY_READ_THREADS", "32"))
+LATE_ARRIVAL_GRACE = timedelta(minutes=int(os.environ.get("FLEET_SUMMARY_GRACE_MINUTES", "15")))
+
+# Metrics available for structured queries (analytics field names from the schema registry)
+METRICS = tuple(FIELD_MAPPING.values())
+SEVERITY_RANK = {"high": 3, "medium": 2, "low": 1}
+TREND_TOLERANCE = 0.05  # relative change of today's mean vs. window mean considered "stable"
+
+
+# ==========================================================
+# AGGREGATION
+# ==========================================================
+# Aggregates are per device: reading count, per-metric count/sum/max (metrics missing from a record
+# are skipped, so records and cached aggregates from before a channel was added still merge),
+# fault counts and the latest reading. Completed hours and days are cached in S3, so a refresh
+# only reads the records of the current hour (and of the previous one while its grace period runs).
+def _read_json(key: str) -> dict:
+    obj = s3_client.get_object(Bucket=S3_BUCKET, Key=key)
+    return json.loads(obj["Body"].read())
+
+
+def _empty_aggregate() -> dict:
+    return {"count": 0, "metric_count": {}, "sum": {}, "max": {}, "fault_counts": {}, "latest": None}
+
+
+def _device(devices: dict, device_id: str) -> dict:
+    if device_id not in devices:
+        devices[device_id] = _empty_aggregate()
+    return devices[device_id]
+
+
+def _add_record(devices: dict, record: dict):
+    device = _device(devices, record["device_id"])
+    device["count"] += 1
+    for metric in METRICS:
+        value = record.get(metric)
+        if value is None:
+            continue
+        device["metric_count"][metric] = device["metric_count"].get(metric, 0) + 1
+        device["sum"][metric] = device["sum"].get(metric, 0.0) + value
+        device["max"][metric] = max(device["max"].get(metric, value), value)
+
+    fault = record["ml_predicted_class"]
+    device["fault_counts"][fault] = device["fault_counts"].get(fault, 0) + 1
+
+    if device["latest"] is None or record["timestamp"] > device["latest"]["timestamp"]:
+        device["latest"] = {
+            "timestamp": record["timestamp"],
+            "fault": fault,
+            "confidence": record["ml_confidence"],
+            "severity": record["fm_severity"],
+        }
+
+
+def _merge_into(devices: dict, other: dict):
+    for device_id, agg in other.items():
+        device = _device(devices, device_id)
+        device["count"] += agg["count"]
+        # Aggregates cached before per-metric counts existed saw every metric once per reading
+        metric_count = agg.get("metric_count") or dict.fromkeys(agg["sum"], agg["count"])
+        for metric, total in agg["sum"].items():
+            device["metric_count"][metric] = device["metric_count"].get(metric, 0) + metric_count[metric]
+            device["sum"][metric] = device["sum"].get(metric, 0.0) + total
+            device["max"][metric] = max(device["max"].get(metric, agg["max"][metric]), agg["max"][metric])
+        for fault, count in agg["fault_counts"].items():
+            device["fault_counts"][fault] = device["fault_counts"].get(fault, 0) + count
+        if agg["latest"] and (device["latest"] is None or agg["latest"]["timestamp"] > device["latest"]["timestamp"]):
+            device["latest"] = agg["latest"]
+
+
+def aggregate_objects(prefix: str, delimiter: str | None = None) -> dict:
+    """Reduce the analytics records under a prefix (only its direct children with delimiter="/")."""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    kwargs = {"Bucket": S3_BUCKET, "Prefix": prefix}
+    if delimiter:
+        kwargs["Delimiter"] = delimiter
+    keys = [obj["Key"] for page in paginator.paginate(**kwargs) for obj in page.get("Contents", [])]
+
+    devices = {}
+    with ThreadPoolExecutor(max_workers=READ_THREADS) as pool:
+        for record in pool.map(_read_json, keys):
+            _add_record(devices, record)
+
+    logger.info(f"Aggregated {len(keys)} records for {len(devices)} devices from s3://{S3_BUCKET}/{prefix}")
+    return devices
+
+
+def _cached_aggregate(cache_key: str, complete: bool, compute) -> dict:
+    """Serve a complete period from its S3 cache (computing and storing it once); never cache open periods."""
+    if complete:
+        try:
+            return _read_json(cache_key)
+        except s3_client.exceptions.NoSuchKey:
+            pass
+
+    devices = compute()
+    if complete:
+        s3_client.put_object(Bucket=S3_BUCKET, Key=cache_key, Body=json.dumps(devices), ContentType="application/json")
+    return devices
+
+
+def load_daily_aggregate(day: datetime, now: datetime) -> dict:
+    """
+    A day is merged from its hourly aggregates. Hours and days count as complete, and are cached,
+    only once LATE_ARRIVAL_GRACE has passed after their end.
+    """
+    date = day.strftime("%Y-%m-%d")
+    day_prefix = f"{ANALYTICS_PREFIX}{day.year}/{day.month:02d}/{day.day:02d}/"
+
+    def compute():
+        devices = {}
+        # Records written before the hourly partitions were introduced sit directly under the day
+        _merge_into(devices, _cached_aggregate(
+            f"{HOURLY_PREFIX}{date}/unpartitioned.json",
+            now >= day + timedelta(days=1) + LATE_ARRIVAL_GRACE,
+            lambda: aggregate_objects(day_prefix, delimiter="/"),
+        ))
+        for hour in range(24):
+            start = day + timedelta(hours=hour)
+            if start > now:
+                break
+            hour_prefix = f"{day_prefix}{hour:02d}/"
+            _merge_into(devices, _cached_aggregate(
+                f"{HOURLY_PREFIX}{date}/{hour:02d}.json",
+                now >= start + timedelta(hours=1) + LATE_ARRIVAL_GRACE,
+                lambda: aggregate_objects(hour_prefix),
+            ))
+        return devices
+
+    return _cached_aggregate(f"{DAILY_PREFIX}{date}.json", now >= day + timedelta(days=1) + LATE_ARRIVAL_GRACE, compute)
+
+
+def _trend(recent: float, baseline: float) -> str:
+    if baseline == 0:
+        return "stable"
+    change = (recent - baseline) / abs(baseline)
+    if change > TREND_TOLERANCE:
+        return "rising"
+    if change < -TREND_TOLERANCE:
+        return "falling"
+    return "stable"
+
+
+def build_fleet_summary(now: datetime | None = None) -> dict:
+    """Merge the last WINDOW_DAYS daily aggregates into one compact summary per device."""
+    now = now or datetime.now(timezone.utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    daily = [load_daily_aggregate(today - timedelta(days=i), now) for i in range(WINDOW_DAYS)]
+
+    merged = {}
+    for devices in daily:
+        _merge_into(merged, devices)
+
+    summary = {}
+    for device_id, device in merged.items():
+        counts = device["metric_count"]
+        metrics = [metric for metric in METRICS if counts.get(metric)]
+        mean = {metric: round(device["sum"][metric] / counts[metric], 3) for metric in metrics}
+
+        today_agg = daily[0].get(device_id)
+        today_counts = today_agg.get("metric_count", {}) if today_agg else {}
+        summary[device_id] = {
+            "latest": device["latest"],
+            "readings": device["count"],
+            "fault_counts": device["fault_counts"],
+            "mean": mean,
+            "max": {metric: round(device["max"][metric], 3) for metric in metrics},
+            "trend": {
+                metric: _trend(today_agg["sum"][metric] / today_counts[metric], mean[metric])
+                if today_counts.get(metric) else "stable"
+                for metric in metrics
+            },
+        }
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "window_days": WINDOW_DAYS,
+        "devices": summary,
+    }
+
+
+def refresh_fleet_summary() -> dict:
+    summary = build_fleet_summary()
+    s3_client.put_object(Bucket=S3_BUCKET, Key=SUMMARY_KEY, Body=json.dumps(summary), ContentType="application/json")
+    logger.info(f"Stored fleet summary for {len(summary['devices'])} devices in s3://{S3_BUCKET}/{SUMMARY_KEY}")
+    return summary
+
+
+def load_fleet_summary() -> dict:
+    return _read_json(SUMMARY_KEY)
+
+
+# ==========================================================
+# STRUCTURED QUERIES
+# ==========================================================
+def severity_rank(device: dict) -> tuple:
+    latest = device["latest"]
+    return SEVERITY_RANK.get(latest["severity"], 0), latest["confidence"]
+
+
+def top_devices(summary: dict, metric: str = "vibration_ms2", stat: str = "mean", limit: int = 10) -> list[dict]:
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Expected one of: {', '.join(METRICS)}")
+    if stat not in ("mean", "max"):
+        raise ValueError(f"Unknown stat '{stat}'. Expected 'mean' or 'max'")
+
+    # Devices without readings for the metric (e.g. a newly added channel) are not ranked
+    candidates = ((device_id, device) for device_id, device in summary["devices"].items() if metric in device[stat])
+    ranked = heapq.nlargest(limit, candidates, key=lambda item: item[1][stat][metric])
+    return [
+        {"device_id": device_id, f"{metric}_{stat}": device[stat][metric], "trend": device["trend"][metric]}
+        for device_id, device in ranked
+    ]
+
+
+def device_health(summary: dict, device_id: str) -> dict:
+    if device_id not in summary["devices"]:
+        raise ValueError(f"No readings for device '{device_id}' in the last {summary['window_days']} days")
+    return {"device_id": device_id, **summary["devices"][device_id]}
+
+
+def fleet_overview(summary: dict) -> dict:
+    by_severity, by_fault = {}, {}
+    for device in summary["devices"].values():
+        latest = device["latest"]
+        by_severity[latest["severity"]] = by_severity.get(latest["severity"], 0) + 1
+        by_fault[latest["fault"]] = by_fault.get(latest["fault"], 0) + 1
+
+    at_risk = heapq.nlargest(5, summary["devices"].items(), key=lambda item: severity_rank(item[1]))
+    return {
+        "generated_at": summary["generated_at"],
+        "window_days": summary["window_days"],
+        "devices": len(summary["devices"]),
+        "latest_severity_counts": by_severity,
+        "latest_fault_counts": by_fault,
+        "most_at_risk": [device_id for device_id, _ in at_risk],
+    }
+
+
+def compact_summary(summary: dict, limit: int) -> str:
+    """One line per device, most at-risk first: device|fault|confidence|severity|vibration trend."""
+    ranked = heapq.nlargest(limit, summary["devices"].items(), key=lambda item: severity_rank(item[1]))
+    lines = [
+        f"{device_id}|{d['latest']['fault']}|{d['latest']['confidence']}|{d['latest']['severity']}|vib {d['trend'].get('vibration_ms2', 'n/a')}"
+        for device_id, d in ranked
+    ]
+    return "\n".join(lines)
+
+
+# ==========================================================
+# LAMBDA HANDLER
+# ==========================================================
+def _action_response(event: dict, body: dict, failed: bool = False) -> dict:
+    function_response = {"responseBody": {"TEXT": {"body": json.dumps(body)}}}
+    if failed:
+        function_response["responseState"] = "FAILURE"
+    return {
+        "messageVersion": "1.0",
+        "response": {
+            "actionGroup": event["actionGroup"],
+            "function": event["function"],
+            "functionResponse": function_response,
+        },
+    }
+
+
+def lambda_handler(event, context):
+    """
+    Bedrock action group events are answered from the stored summary; any other
+    invocation (the EventBridge schedule) rebuilds the summary.
+    """
+    if "actionGroup" not in event:
+        summary = refresh_fleet_summary()
+        return {"statusCode": 200, "body": json.dumps({"devices": len(summary["devices"])})}
+
+    params = {p["name"]: p["value"] for p in event.get("parameters", [])}
+    logger.info(f"Action group call: {event['function']} {params}")
+
+    try:
+        summary = load_fleet_summary()
+        if event["function"] == "top_devices":
+            body = top_devices(
+                summary,
+                metric=params.get("metric", "vibration_ms2"),
+                stat=params.get("stat", "mean"),
+                limit=int(params.get("limit", 10)),
+            )
+        elif event["function"] == "device_health":
+            body = device_health(summary, params["device_id"])
+        elif event["function"] == "fleet_overview":
+            body = fleet_overview(summary)
+        else:
+            raise ValueError(f"Unknown function '{event['function']}'")
+        return _action_response(event, body)
+
+    except Exception as e:
+        logger.exception("Action group call failed.")
+        return _action_response(event, {"error": str(e)}, failed=True)
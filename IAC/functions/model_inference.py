@@ -3,7 +3,11 @@ import json
 import os
 import logging
 import uuid
+import bisect
 from datetime import datetime
+from types import MappingProxyType
+
+from sensor_schema import CHANNELS, FIELD_MAPPING, NUMERIC_COLUMNS
 
 # Set up logging
 logger = logging.getLogger()
@@ -20,73 +24,144 @@ sagemaker_client = boto3.client('sagemaker-runtime')
 
 ENDPOINT_NAME = os.environ.get('SAGEMAKER_ENDPOINT_NAME', 'pytorch-inference-2025-09-11-14-15-37-612')
 
-# Incoming fields (model expects these exact names)
-REQUIRED_FIELDS = [
-    "Speed (rpm)",
-    "Load (kg)",
-    "Temperature (℃)",
-    "Vibration (m/s²)",
-    "Current (A)"
-]
-
-# Mapping for output cleanup
-FIELD_MAPPING = {
-    "Speed (rpm)": "speed_rpm",
-    "Load (kg)": "load_kg",
-    "Temperature (℃)": "temperature_c",
-    "Vibration (m/s²)": "vibration_ms2",
-    "Current (A)": "current_a"
-}
+# Incoming fields (model expects these exact names) and their output names come from the schema registry
+REQUIRED_FIELDS = NUMERIC_COLUMNS
 
-# Fault dictionary
+# Fault dictionary, keyed by the canonical class names emitted by the simulator
 FAULT_KB = {
-    "ball bearing": {
+    "normal": {
+        "label": "Normal operation",
+        "severity": "none",
+        "recommendation": "No action required"
+    },
+    "ball_bearing": {
         "label": "Ball Bearing Fault detected",
         "severity": "high",
         "recommendation": "Shut down immediately and replace bearing"
     },
-    "central_shaft_fault": {
+    "central_shaft": {
         "label": "Central Shaft Fault detected",
         "severity": "high",
         "recommendation": "Inspect shaft alignment and lubrication urgently"
     },
-    "pulley_fault": {
+    "pulley": {
         "label": "Pulley Fault detected",
         "severity": "medium",
         "recommendation": "Check pulley alignment and wear within 24 hours"
     },
-    "drive motor": {
+    "drive_motor": {
         "label": "Drive Motor Fault detected",
         "severity": "high",
         "recommendation": "Inspect motor windings and insulation immediately"
     },
-    "idler_roller_fault": {
+    "idler_roller": {
         "label": "Idler Roller Fault detected",
         "severity": "low",
         "recommendation": "Schedule roller inspection during next maintenance"
     },
-    "belt slippage": {
+    "belt_slippage": {
         "label": "Potential Belt Slippage - recommend inspection",
         "severity": "medium",
         "recommendation": "Inspect belt tension and alignment within 24 hours"
     }
 }
 
+# Model output class index -> canonical class, in the model's label-encoder order (e.g. "ball_bearing,normal,...").
+# Integer class indices are only resolved when this is set; without it predictions must be class names.
+MODEL_CLASSES = tuple(c.strip() for c in os.environ.get("MODEL_CLASSES", "").split(",") if c.strip())
+_unknown_classes = [c for c in MODEL_CLASSES if c not in FAULT_KB]
+if _unknown_classes:
+    raise ValueError(f"MODEL_CLASSES contains classes missing from FAULT_KB: {_unknown_classes} "
+                     f"(known classes: {sorted(FAULT_KB)})")
+
+# Optional ascending confidence thresholds (e.g. "0.5,0.8"). Each threshold a prediction's confidence
+# falls below lowers its severity by one level; empty (the default) leaves severities unchanged
+CONFIDENCE_THRESHOLDS = tuple(float(t) for t in os.environ.get("CONFIDENCE_THRESHOLDS", "").split(",") if t.strip())
+if list(CONFIDENCE_THRESHOLDS) != sorted(CONFIDENCE_THRESHOLDS):
+    raise ValueError(f"CONFIDENCE_THRESHOLDS must be in ascending order: {CONFIDENCE_THRESHOLDS}")
+SEVERITY_LEVELS = ("none", "low", "medium", "high")
+
+
+def _build_refinement_table():
+    """
+    Precompute one read-only (MappingProxyType) refinement record per (class, confidence band) and an alias
+    index covering label spellings and, when MODEL_CLASSES is set, model class indices, so lookups need no
+    normalization. Table rows follow MODEL_CLASSES order, then any remaining FAULT_KB classes.
+    """
+    classes = MODEL_CLASSES + tuple(fault for fault in FAULT_KB if fault not in MODEL_CLASSES)
+    n_bands = len(CONFIDENCE_THRESHOLDS) + 1
+    table = []
+    for fault in classes:
+        base = FAULT_KB[fault]
+        level = SEVERITY_LEVELS.index(base["severity"])
+        for band in range(n_bands):
+            downgrade = n_bands - 1 - band
+            # A detected fault never drops below "low"; "none" stays "none"
+            severity = SEVERITY_LEVELS[max(level - downgrade, min(level, 1))]
+            label, recommendation = base["label"], base["recommendation"]
+            if downgrade and level:
+                label += " (low confidence)"
+                recommendation += "; confirm with a manual inspection before acting"
+            table.append(MappingProxyType({
+                "label": label,
+                "severity": severity,
+                "recommendation": recommendation,
+            }))
+
+    aliases = {}
+    for index, fault in enumerate(classes):
+        if index < len(MODEL_CLASSES):
+            aliases[index] = aliases[str(index)] = index
+        for name in (fault, fault.replace("_", " ")):
+            for alias in (name, f"{name}_fault", f"{name} fault"):
+                for variant in (alias, alias.title(), alias.upper()):
+                    aliases[variant] = index
+    return tuple(table), aliases, n_bands
+
+
+REFINEMENT_TABLE, CLASS_ALIASES, N_CONFIDENCE_BANDS = _build_refinement_table()
+
+
+def _class_index(predicted_class):
+    index = CLASS_ALIASES.get(predicted_class)
+    if index is None and isinstance(predicted_class, str):
+        # Slow path for spellings not covered by the precomputed aliases
+        key = predicted_class.strip().lower().replace("-", "_").replace(" ", "_").removesuffix("_fault")
+        index = CLASS_ALIASES.get(key)
+    return index
+
+
+def refine_predictions(predicted_classes: list, confidences: list) -> list[MappingProxyType]:
+    """
+    Map a batch of model predictions to read-only refinement records. Known classes resolve to
+    shared precomputed records; unknown classes get an unmapped record.
+    """
+    refined = []
+    for predicted_class, confidence in zip(predicted_classes, confidences):
+        index = _class_index(predicted_class)
+        if index is None:
+            refined.append(MappingProxyType({
+                "label": f"Unmapped fault type: {predicted_class}",
+                "severity": "unknown",
+                "recommendation": "Further analysis required"
+            }))
+            continue
+        band = bisect.bisect_right(CONFIDENCE_THRESHOLDS, confidence)
+        refined.append(REFINEMENT_TABLE[index * N_CONFIDENCE_BANDS + band])
+    return refined
+
 def format_payload_as_text(payload: dict) -> str:
     """
     Convert structured payload into a rich text report.
     """
+    operating_conditions = "\n".join(f"- {ch.label}: {payload[ch.field_name]} {ch.unit}" for ch in CHANNELS)
     return f"""[Device Report]
 
 Device ID: {payload['device_id']}
 Timestamp: {payload['timestamp']}
 
 Operating Conditions:
-- Speed: {payload['speed_rpm']} rpm
-- Load: {payload['load_kg']} kg
-- Temperature: {payload['temperature_c']} °C
-- Vibration: {payload['vibration_ms2']} m/s²
-- Current: {payload['current_a']} A
+{operating_conditions}
 
 Model Inference:
 - Predicted Fault: {payload['ml_predicted_class']}
@@ -141,14 +216,7 @@ def lambda_handler(event, context):
         clean_fields["device_id"] = event.get("DeviceId", "unknown_device")
         clean_fields["timestamp"] = event.get("Timestamp", datetime.utcnow().isoformat() + "Z")
 
-        # Normalize key for lookup
-        # normalized_class = predicted_class.lower().replace(" ", "_")
-
-        fault_info = FAULT_KB.get(predicted_class, {
-            "label": f"Unmapped fault type: {predicted_class}",
-            "severity": "unknown",
-            "recommendation": "Further analysis required"
-        })
+        fault_info = refine_predictions([predicted_class], [confidence])[0]
 
         print('Fault Info::', fault_info)
 
@@ -167,7 +235,8 @@ def lambda_handler(event, context):
         ts = datetime.fromisoformat(combined_payload["timestamp"].replace("Z", ""))
 
         # Partitioned path
-        partition_path = f"inference_analytics/{ts.year}/{ts.month:02d}/{ts.day:02d}/"
+        # Hourly partitions let the fleet health summary aggregate completed hours once
+        partition_path = f"inference_analytics/{ts.year}/{ts.month:02d}/{ts.day:02d}/{ts.hour:02d}/"
 
         # Unique file name
         file_name = f"{combined_payload['device_id']}_{ts.strftime('%H%M%S')}_{uuid.uuid4().hex}.json"
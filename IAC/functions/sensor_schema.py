@@ -0,0 +1,47 @@
+"""
+Sensor schema registry shared by the simulator, feature engineering and inference Lambdas.
+Channels are declared once here; every per-channel name list and mapping is built at import.
+Cross-channel (derived) features are defined next to compute_features in feature_engineering.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Channel:
+    key: str          # short identifier used in code ("vibration")
+    column: str       # raw column / payload field name ("Vibration (m/s²)")
+    label: str        # display name used in reports ("Vibration")
+    unit: str         # display unit used in reports ("m/s²")
+    dtype: str
+    safe_name: str    # prefix for engineered feature names ("Vibration_m_s2")
+    field_name: str   # snake_case name used in analytics output ("vibration_ms2")
+
+
+# ==========================================================
+# CHANNEL REGISTRY
+# ==========================================================
+# Order matters: it is the column order of simulated batches, the order of the
+# model payload and the order of engineered features. Append new channels at the end.
+CHANNELS = (
+    Channel("speed",       "Speed (rpm)",      "Speed",       "rpm",  "float64", "Speed_rpm",      "speed_rpm"),
+    Channel("load",        "Load (kg)",        "Load",        "kg",   "float64", "Load_kg",        "load_kg"),
+    Channel("temperature", "Temperature (℃)",  "Temperature", "°C",   "float64", "Temperature_C",  "temperature_c"),
+    Channel("vibration",   "Vibration (m/s²)", "Vibration",   "m/s²", "float64", "Vibration_m_s2", "vibration_ms2"),
+    Channel("current",     "Current (A)",      "Current",     "A",    "float64", "Current_A",      "current_a"),
+)
+
+# Per-channel window statistics computed by feature engineering
+WINDOW_STATS = ("mean", "std", "min", "max", "rms", "ptp")
+
+
+# ==========================================================
+# PRECOMPUTED LOOKUPS
+# ==========================================================
+COLUMN = {ch.key: ch.column for ch in CHANNELS}
+
+NUMERIC_COLUMNS = [ch.column for ch in CHANNELS]
+COLUMN_DTYPES = {ch.column: ch.dtype for ch in CHANNELS}
+FIELD_MAPPING = {ch.column: ch.field_name for ch in CHANNELS}
+
+STAT_FEATURE_NAMES = {ch.column: tuple(f"{ch.safe_name}_{stat}" for stat in WINDOW_STATS) for ch in CHANNELS}
+CHANNEL_FEATURE_NAMES = [name for ch in CHANNELS for name in STAT_FEATURE_NAMES[ch.column]]
@@ -0,0 +1,478 @@
+"""
+Long-running streaming consumer for conveyor sensor batches.
+Alternative to the per-message Lambda path: pulls batches from a queue source, featurizes them
+on a process pool and runs the same inference/persistence steps as feature_engineering.
+"""
+import asyncio, json, os, queue, signal, time, uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+import boto3
+from botocore.exceptions import ClientError
+
+from feature_engineering import features_from_json, invoke_model, save_features, save_inference
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+STREAM_SOURCE       = os.getenv("STREAM_SOURCE", "sqs")  # sqs | kinesis | mqtt
+SQS_QUEUE_URL       = os.getenv("SQS_QUEUE_URL", "")
+KINESIS_STREAM_NAME = os.getenv("KINESIS_STREAM_NAME", "")
+CHECKPOINT_BUCKET   = os.getenv("CHECKPOINT_BUCKET", "predictive-maintenance-feature-store")
+CHECKPOINT_KEY      = os.getenv("CHECKPOINT_KEY", f"stream_checkpoints/{KINESIS_STREAM_NAME}.json")
+DEAD_LETTER_PREFIX  = os.getenv("DEAD_LETTER_PREFIX", f"stream_dead_letters/{KINESIS_STREAM_NAME}/")
+MAX_ATTEMPTS        = int(os.getenv("MAX_ATTEMPTS", "3"))
+MQTT_HOST           = os.getenv("MQTT_HOST", "localhost")
+MQTT_PORT           = int(os.getenv("MQTT_PORT", "1883"))
+MQTT_TOPIC          = os.getenv("MQTT_TOPIC", "predictive-maintenance/sensor-data-1")
+FEATURE_WORKERS     = int(os.getenv("FEATURE_WORKERS", str(os.cpu_count() or 1)))
+MAX_IN_FLIGHT       = int(os.getenv("MAX_IN_FLIGHT", "64"))
+RECEIVE_BATCH_SIZE  = int(os.getenv("RECEIVE_BATCH_SIZE", "10"))
+RECEIVE_BACKOFF_MAX = float(os.getenv("RECEIVE_BACKOFF_MAX", "30"))
+
+
+@dataclass
+class Message:
+    body: str
+    source_key: str
+    receipt: Any = None
+
+
+# ==========================================================
+# QUEUE SOURCES
+# ==========================================================
+# A source exposes `receive(max_messages)` returning a list of Messages (None once exhausted),
+# `ack(message)` called after the message has been fully processed, `nack(message, error)` called
+# when processing failed, and `close()`.
+# SQS and Kinesis (checkpointed) are at-least-once; MQTT is at-most-once and meant for local runs.
+
+class InMemorySource:
+    """asyncio.Queue-backed source for local runs and tests. Put None to signal end of stream."""
+
+    def __init__(self, maxsize: int = 0):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.acked = []
+        self.failed = []
+
+    async def receive(self, max_messages: int) -> list[Message] | None:
+        item = await self.queue.get()
+        if item is None:
+            return None
+        messages = [item]
+        while len(messages) < max_messages and not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is None:
+                self.queue.put_nowait(None)  # end of stream after this batch
+                break
+            messages.append(item)
+        return messages
+
+    async def ack(self, message: Message):
+        self.acked.append(message)
+
+    async def nack(self, message: Message, error: Exception):
+        self.failed.append(message)
+
+    async def close(self):
+        pass
+
+
+class SqsSource:
+    """SQS queue fed by an IoT rule. Messages are deleted only after successful processing."""
+
+    def __init__(self, queue_url: str):
+        self.queue_url = queue_url
+        self.sqs = boto3.client("sqs")
+
+    async def receive(self, max_messages: int) -> list[Message] | None:
+        response = await asyncio.to_thread(
+            self.sqs.receive_message,
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_messages, 10),
+            WaitTimeSeconds=20,
+        )
+        return [
+            Message(body=m["Body"], source_key=f"sqs:{m['MessageId']}", receipt=m["ReceiptHandle"])
+            for m in response.get("Messages", [])
+        ]
+
+    async def ack(self, message: Message):
+        await asyncio.to_thread(self.sqs.delete_message, QueueUrl=self.queue_url, ReceiptHandle=message.receipt)
+
+    async def nack(self, message: Message, error: Exception):
+        pass  # redelivered after the visibility timeout; the queue's redrive policy handles dead letters
+
+    async def close(self):
+        pass
+
+
+class KinesisSource:
+    """
+    Kinesis stream reader with per-shard checkpoints stored in S3.
+    A shard's checkpoint only advances past records whose predecessors were all acked, so a restart
+    resumes after the last fully processed record (AFTER_SEQUENCE_NUMBER). Failed records are
+    retried up to `max_attempts` times, then parked under `dead_letter_prefix` and acked.
+    Child shards are started once all their parents have been read to the end and fully acked.
+    """
+
+    def __init__(self, stream_name: str, checkpoint_bucket: str, checkpoint_key: str,
+                 dead_letter_prefix: str, initial_position: str = "TRIM_HORIZON",
+                 checkpoint_interval: float = 10.0, max_attempts: int = 3,
+                 records_per_call: int = 1000, poll_interval: float = 0.25, error_backoff: float = 2.0,
+                 max_pending_per_shard: int = 10000):
+        self.stream_name = stream_name
+        self.checkpoint_bucket = checkpoint_bucket
+        self.checkpoint_key = checkpoint_key
+        self.dead_letter_prefix = dead_letter_prefix
+        self.initial_position = initial_position
+        self.checkpoint_interval = checkpoint_interval
+        self.max_attempts = max_attempts
+        self.records_per_call = records_per_call
+        self.poll_interval = poll_interval  # per shard; GetRecords is limited to 5 calls/s per shard
+        self.error_backoff = error_backoff
+        self.max_pending_per_shard = max_pending_per_shard
+        self.kinesis = boto3.client("kinesis")
+        self.s3 = boto3.client("s3")
+        self.shards = None     # shard -> parent shard ids
+        self.iterators = {}    # open shard being read -> iterator (None when one must be fetched)
+        self.closed = set()    # shards read to the end
+        self.next_poll = {}    # shard -> earliest monotonic time for the next GetRecords
+        self.checkpoints = {}  # shard -> last sequence number processed together with all predecessors
+        self.positions = {}    # shard -> last sequence number received
+        self.pending = {}      # shard -> deque of [sequence number, acked] in arrival order
+        self.paused = set()    # shards not read because their pending backlog is full
+        self.retry = deque()   # failed messages waiting for redelivery
+        self.attempts = {}     # source_key -> failed attempts so far
+        self.relist_needed = True
+        self.checkpoint_dirty = False
+        self.checkpoint_saved_at = 0.0
+
+    async def _load_checkpoints(self):
+        try:
+            obj = await asyncio.to_thread(self.s3.get_object, Bucket=self.checkpoint_bucket, Key=self.checkpoint_key)
+            self.checkpoints = json.loads(obj["Body"].read())
+            print(f"✅ Resuming from {len(self.checkpoints)} shard checkpoints")
+        except self.s3.exceptions.NoSuchKey:
+            self.checkpoints = {}
+
+    async def _list_shards(self):
+        shards = {}
+        kwargs = {"StreamName": self.stream_name}
+        while True:
+            response = await asyncio.to_thread(self.kinesis.list_shards, **kwargs)
+            for shard in response["Shards"]:
+                shards[shard["ShardId"]] = [
+                    p for p in (shard.get("ParentShardId"), shard.get("AdjacentParentShardId")) if p
+                ]
+            if not response.get("NextToken"):
+                break
+            kwargs = {"NextToken": response["NextToken"]}
+        self.shards = shards
+        self.relist_needed = False
+
+    def _parents_drained(self, shard_id: str) -> bool:
+        # Parents that are no longer listed have aged out of the stream's retention period
+        return all(
+            parent not in self.shards or (parent in self.closed and not self.pending.get(parent))
+            for parent in self.shards[shard_id]
+        )
+
+    async def _shard_iterator(self, shard_id: str) -> str:
+        sequence_number = self.positions.get(shard_id) or self.checkpoints.get(shard_id)
+        if sequence_number:
+            kwargs = {"ShardIteratorType": "AFTER_SEQUENCE_NUMBER", "StartingSequenceNumber": sequence_number}
+        elif any(parent in self.shards for parent in self.shards.get(shard_id, [])):
+            kwargs = {"ShardIteratorType": "TRIM_HORIZON"}  # child shard: start where its parents ended
+        else:
+            kwargs = {"ShardIteratorType": self.initial_position}
+        response = await asyncio.to_thread(
+            self.kinesis.get_shard_iterator, StreamName=self.stream_name, ShardId=shard_id, **kwargs
+        )
+        return response["ShardIterator"]
+
+    async def _poll_shard(self, shard_id: str) -> list[Message]:
+        """Read one batch from a shard; errors are contained to the shard and leave its state untouched."""
+        try:
+            if self.iterators[shard_id] is None:
+                self.iterators[shard_id] = await self._shard_iterator(shard_id)
+            response = await asyncio.to_thread(
+                self.kinesis.get_records, ShardIterator=self.iterators[shard_id], Limit=self.records_per_call
+            )
+        except Exception as e:
+            if isinstance(e, ClientError) and e.response["Error"]["Code"] == "ExpiredIteratorException":
+                # Polling stalled (e.g. under backpressure) for longer than the iterator lifetime
+                self.iterators[shard_id] = None
+            else:
+                print(f"⚠️ GetRecords failed on {shard_id}: {e}; backing off {self.error_backoff}s")
+                self.next_poll[shard_id] = time.monotonic() + self.error_backoff
+            return []
+
+        self.next_poll[shard_id] = time.monotonic() + self.poll_interval
+        messages = []
+        for r in response["Records"]:
+            entry = [r["SequenceNumber"], False]
+            self.pending[shard_id].append(entry)
+            self.positions[shard_id] = r["SequenceNumber"]
+            messages.append(Message(
+                body=r["Data"].decode("utf-8"),
+                source_key=f"kinesis:{shard_id}:{r['SequenceNumber']}",
+                receipt=(shard_id, entry),
+            ))
+
+        if response.get("NextShardIterator") is None:
+            print(f"🔚 Shard {shard_id} closed; looking for child shards")
+            del self.iterators[shard_id]
+            self.closed.add(shard_id)
+            self.relist_needed = True
+        else:
+            self.iterators[shard_id] = response["NextShardIterator"]
+        return messages
+
+    async def receive(self, max_messages: int) -> list[Message] | None:
+        if self.shards is None:
+            await self._load_checkpoints()
+        if self.relist_needed:
+            try:
+                await self._list_shards()
+            except Exception as e:
+                if self.shards is None:
+                    raise
+                print(f"⚠️ ListShards failed: {e}; retrying on next poll")
+
+        for shard_id in self.shards:
+            if shard_id not in self.iterators and shard_id not in self.closed and self._parents_drained(shard_id):
+                self.pending.setdefault(shard_id, deque())
+                self.iterators[shard_id] = None
+
+        messages = []
+        while self.retry:
+            messages.append(self.retry.popleft())
+
+        now = time.monotonic()
+        for shard_id in list(self.iterators):
+            if now < self.next_poll.get(shard_id, 0.0):
+                continue
+            if len(self.pending[shard_id]) >= self.max_pending_per_shard:
+                if shard_id not in self.paused:
+                    print(f"⚠️ Shard {shard_id} has {len(self.pending[shard_id])} unacked records; pausing reads")
+                    self.paused.add(shard_id)
+                continue
+            self.paused.discard(shard_id)
+            messages += await self._poll_shard(shard_id)
+
+        if not messages:
+            # Sleep until the next shard is due instead of hammering GetRecords
+            wait = min(self.next_poll.values(), default=now + self.poll_interval) - time.monotonic()
+            await asyncio.sleep(min(max(wait, 0.05), 1.0))
+        return messages
+
+    async def ack(self, message: Message):
+        self.attempts.pop(message.source_key, None)
+        shard_id, entry = message.receipt
+        entry[1] = True
+        pending = self.pending[shard_id]
+        while pending and pending[0][1]:
+            self.checkpoints[shard_id] = pending.popleft()[0]
+            self.checkpoint_dirty = True
+
+        if self.checkpoint_dirty and time.monotonic() - self.checkpoint_saved_at >= self.checkpoint_interval:
+            await self.save_checkpoints()
+
+    async def nack(self, message: Message, error: Exception):
+        attempts = self.attempts.get(message.source_key, 0) + 1
+        if attempts < self.max_attempts:
+            self.attempts[message.source_key] = attempts
+            self.retry.append(message)
+            return
+
+        shard_id, entry = message.receipt
+        dead_letter_key = f"{self.dead_letter_prefix}{shard_id}/{entry[0]}.json"
+        await asyncio.to_thread(
+            self.s3.put_object,
+            Bucket=self.checkpoint_bucket,
+            Key=dead_letter_key,
+            Body=json.dumps({"source_key": message.source_key, "attempts": attempts, "error": str(error), "body": message.body}),
+        )
+        print(f"☠️ Parked {message.source_key} after {attempts} attempts in s3://{self.checkpoint_bucket}/{dead_letter_key}")
+        await self.ack(message)
+
+    async def save_checkpoints(self):
+        self.checkpoint_dirty = False
+        self.checkpoint_saved_at = time.monotonic()
+        await asyncio.to_thread(
+            self.s3.put_object,
+            Bucket=self.checkpoint_bucket,
+            Key=self.checkpoint_key,
+            Body=json.dumps(self.checkpoints),
+        )
+
+    async def close(self):
+        if self.checkpoint_dirty:
+            await self.save_checkpoints()
+
+
+class MqttSource:
+    """
+    Subscribes to a local MQTT broker (at-most-once). A full buffer blocks the client thread,
+    throttling the broker.
+    """
+
+    def __init__(self, host: str, port: int, topic: str, buffer_size: int = 1000, poll_timeout: float = 1.0):
+        import paho.mqtt.client as mqtt  # optional dependency, only needed for this source
+
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.poll_timeout = poll_timeout
+        try:
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1)
+        except AttributeError:  # paho-mqtt < 2.0 has no callback API versions
+            self.client = mqtt.Client()
+        self.client.on_connect = lambda client, userdata, flags, rc: client.subscribe(topic)
+        self.client.on_message = lambda client, userdata, msg: self.buffer.put(
+            Message(body=msg.payload.decode("utf-8"), source_key=f"mqtt:{msg.topic}")
+        )
+        self.client.connect(host, port)
+        self.client.loop_start()
+
+    async def receive(self, max_messages: int) -> list[Message] | None:
+        # Poll with a timeout so a cancelled receive never leaves an executor thread blocked forever
+        while True:
+            try:
+                messages = [await asyncio.to_thread(self.buffer.get, timeout=self.poll_timeout)]
+                break
+            except queue.Empty:
+                continue
+        while len(messages) < max_messages:
+            try:
+                messages.append(self.buffer.get_nowait())
+            except queue.Empty:
+                break
+        return messages
+
+    async def ack(self, message: Message):
+        pass
+
+    async def nack(self, message: Message, error: Exception):
+        pass
+
+    async def close(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+def build_source(name: str):
+    if name == "sqs":
+        return SqsSource(SQS_QUEUE_URL)
+    if name == "kinesis":
+        return KinesisSource(KINESIS_STREAM_NAME, CHECKPOINT_BUCKET, CHECKPOINT_KEY, DEAD_LETTER_PREFIX,
+                             max_attempts=MAX_ATTEMPTS)
+    if name == "mqtt":
+        return MqttSource(MQTT_HOST, MQTT_PORT, MQTT_TOPIC)
+    raise ValueError(f"Unknown stream source: {name}")
+
+
+# ==========================================================
+# CONSUMER LOOP
+# ==========================================================
+async def process_message(message: Message, pool: ProcessPoolExecutor) -> dict:
+    loop = asyncio.get_running_loop()
+
+    # CPU-bound featurization runs on the process pool, I/O runs on threads
+    features = await loop.run_in_executor(pool, features_from_json, message.body)
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    object_id = uuid.uuid4().hex
+    await asyncio.to_thread(save_features, features, timestamp, object_id)
+    result = await asyncio.to_thread(invoke_model, features)
+    await asyncio.to_thread(save_inference, features, result, timestamp, message.source_key, object_id)
+    return result
+
+
+async def run_consumer(source, workers: int = FEATURE_WORKERS, max_in_flight: int = MAX_IN_FLIGHT,
+                       stop: asyncio.Event | None = None, process=process_message) -> dict:
+    """
+    Pump messages from `source` through `process` until the source is exhausted or `stop` is set.
+    Up to `max_in_flight` messages are processed concurrently with as many buffered; beyond that the source is not polled.
+    Receive errors are logged and retried with exponential backoff.
+    """
+    stop = stop or asyncio.Event()
+    inbox = asyncio.Queue(maxsize=max_in_flight)
+    stats = {"processed": 0, "failed": 0}
+    backoff = 1.0
+
+    async def worker(pool):
+        while True:
+            message = await inbox.get()
+            try:
+                await process(message, pool)
+                await source.ack(message)
+                stats["processed"] += 1
+            except Exception as e:
+                # The source decides whether to redeliver, dead-letter or drop the message
+                stats["failed"] += 1
+                print(f"❌ Failed to process {message.source_key}: {e}")
+                try:
+                    await source.nack(message, e)
+                except Exception as nack_error:
+                    print(f"⚠️ Could not hand back {message.source_key}: {nack_error}")
+            finally:
+                inbox.task_done()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        tasks = [asyncio.create_task(worker(pool)) for _ in range(max_in_flight)]
+        try:
+            while not stop.is_set():
+                receive = asyncio.create_task(source.receive(RECEIVE_BATCH_SIZE))
+                stopped = asyncio.create_task(stop.wait())
+                await asyncio.wait({receive, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                stopped.cancel()
+                if not receive.done():
+                    receive.cancel()
+                    break
+
+                try:
+                    messages = receive.result()
+                except Exception as e:
+                    print(f"⚠️ Receive failed: {e}; retrying in {backoff:.0f}s")
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=backoff)
+                    except asyncio.TimeoutError:
+                        pass
+                    backoff = min(backoff * 2, RECEIVE_BACKOFF_MAX)
+                    continue
+
+                backoff = 1.0
+                if messages is None:
+                    break
+                for message in messages:
+                    await inbox.put(message)  # backpressure: blocks while the pipeline is full
+
+            await inbox.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await source.close()
+
+    print(f"📊 Consumer stopped: {stats['processed']} processed, {stats['failed']} failed")
+    return stats
+
+
+# ==========================================================
+# ENTRYPOINT
+# ==========================================================
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    source = build_source(STREAM_SOURCE)
+    print(f"🚀 Streaming consumer started (source: {STREAM_SOURCE}, workers: {FEATURE_WORKERS}, in-flight: {MAX_IN_FLIGHT})")
+    await run_consumer(source, stop=stop)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
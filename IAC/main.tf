@@ -37,6 +37,7 @@ module "subnets" {
 module "iam" {
   source = "./modules/iam"
 
+  analytics_bucket_name = var.analytics_bucket_name
 }
 
 # Module for Lambda Function
@@ -52,6 +53,8 @@ module "lambda" {
   bedrock_agent_lambda_name                          = var.bedrock_agent_lambda_name
   feature_engineer_lambda_name                       = var.feature_engineer_lambda_name
   feature_engineer_lambda_execution_role_arn         = module.iam.lambda_execution_role_arn
+  fleet_health_lambda_name                           = var.fleet_health_lambda_name
+  fleet_health_lambda_execution_role_arn             = module.iam.lambda_execution_role_arn
 }
 
 # Module for IoT Core
@@ -69,6 +72,14 @@ module "eventsbridge" {
   target_arn    = module.lambda.conveyor_motor_simulator_lambda_function_arn
 }
 
+# Module for EventBridge Rule refreshing the fleet health summary
+module "fleet_health_refresh" {
+  source = "./modules/eventsbridge"
+
+  schedule_name = var.fleet_health_schedule_name
+  target_arn    = module.lambda.fleet_health_lambda_function_arn
+}
+
 module "sagemaker" {
   source = "./modules/sagemaker"
 
@@ -37,6 +37,31 @@ resource "aws_iam_policy" "lambda_s3_policy" {
   })
 }
 
+# Fleet health Lambda writes its daily aggregates and summary under fleet_summary/
+resource "aws_iam_policy" "lambda_fleet_summary_write_policy" {
+  name        = "lambda_fleet_summary_write_policy"
+  description = "Allow Lambda functions to write fleet health summaries to S3"
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject"
+        ]
+        Resource = [
+          "arn:aws:s3:::${var.analytics_bucket_name}/fleet_summary/*"
+        ]
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_fleet_summary_write_attach" {
+  role       = aws_iam_role.lambda_role.name
+  policy_arn = aws_iam_policy.lambda_fleet_summary_write_policy.arn
+}
+
 resource "aws_iam_policy" "lambda_iot_publish_policy" {
   name        = "lambda_iot_publish_policy"
   description = "Allow Lambda functions to publish to AWS IoT Core topics"
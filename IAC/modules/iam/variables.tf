@@ -0,0 +1,4 @@
+variable "analytics_bucket_name" {
+  description = "Name of the S3 bucket holding inference analytics and fleet health summaries"
+  type        = string
+}
@@ -0,0 +1,33 @@
+locals {
+  parent_dir4 = path.cwd
+}
+
+
+resource "aws_lambda_function" "fleet_health" {
+  function_name = var.fleet_health_lambda_name
+
+  runtime = "python3.13"
+  role    = var.fleet_health_lambda_execution_role_arn
+  handler = "${var.fleet_health_lambda_name}.lambda_handler"
+
+  # Path to your zipped Lambda function code (must also contain sensor_schema.py)
+  filename         = "${local.parent_dir4}/functions/${var.fleet_health_lambda_name}.zip"
+  source_code_hash = filebase64sha256("${local.parent_dir4}/functions/${var.fleet_health_lambda_name}.zip")
+
+  # Timeout and memory settings (summary refresh reads a day of analytics records)
+  timeout     = 300
+  memory_size = 512
+  environment {
+    variables = var.app_env_vars
+  }
+}
+
+
+# Grant bedrock permission to invoke the fleet health action group Lambda
+resource "aws_lambda_permission" "fleet_health_bedrock_policy" {
+  statement_id  = "AllowBedrockAgentInvoke"
+  action        = "lambda:InvokeFunction"
+  principal     = "bedrock.amazonaws.com"
+  function_name = aws_lambda_function.fleet_health.function_name
+  source_arn    = var.bedrock_agent_arn
+}
@@ -28,4 +28,15 @@ output "feature_engineer_lambda_function_arn" {
 output "feature_engineer_lambda_function_name" {
   description = "Name of the Feature Engineer Lambda function"
   value       = aws_lambda_function.feature_engineer.function_name
-}
\ No newline at end of file
+}
+
+output "fleet_health_lambda_function_arn" {
+  description = "ARN of the Fleet Health Lambda function"
+  value       = aws_lambda_function.fleet_health.arn
+
+}
+
+output "fleet_health_lambda_function_name" {
+  description = "Name of the Fleet Health Lambda function"
+  value       = aws_lambda_function.fleet_health.function_name
+}
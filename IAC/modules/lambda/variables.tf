@@ -53,4 +53,16 @@ variable "feature_engineer_lambda_execution_role_arn" {
   description = "ARN of the IAM role assumed by the feature engineering Lambda function"
   type        = string
 
-}
\ No newline at end of file
+}
+
+variable "fleet_health_lambda_name" {
+  description = "Name of the fleet health summary / Bedrock action group Lambda function"
+  type        = string
+
+}
+
+variable "fleet_health_lambda_execution_role_arn" {
+  description = "ARN of the IAM role assumed by the fleet health Lambda function"
+  type        = string
+
+}
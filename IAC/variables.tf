@@ -66,12 +66,30 @@ variable "conveyor_batch_bucket_name" {
   default     = "predictive-maintenance-models-1"
 }
 
+variable "analytics_bucket_name" {
+  description = "Name of the S3 bucket holding inference analytics and fleet health summaries"
+  type        = string
+  default     = "relu-quicksight"
+}
+
 variable "feature_engineer_lambda_name" {
   description = "Name of the feature engineering Lambda function"
   type        = string
   default     = "feature_engineering"
 }
 
+variable "fleet_health_lambda_name" {
+  description = "Name of the fleet health summary / Bedrock action group Lambda function"
+  type        = string
+  default     = "fleet_health"
+}
+
+variable "fleet_health_schedule_name" {
+  description = "Name of the EventBridge rule refreshing the fleet health summary"
+  type        = string
+  default     = "fleet-health-refresh"
+}
+
 variable "sagemaker_domain_name" {
   description = "Name of the SageMaker domain"
   type        = string